@@ -1,12 +1,184 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from scipy import stats
+
+# Cost components, in the order compute_costs() returns them
+COST_LABELS = ['Land Cost', 'Construction Cost', 'Maintenance Cost (NPV)', 'Opportunity Cost', 'Environmental Cost']
+
+# Column layout of the saved-scenario table, kept as one columnar DataFrame in
+# session state so comparisons don't rebuild it from a list of dicts each rerun
+SCENARIO_DTYPES = {
+    "Scenario": "object",
+    "Type": "object",
+    "Total Cost (NPV)": "float64",
+    "Cost per Space": "float64",
+    "Cost per Year": "float64",
+    "Land Cost": "float64",
+    "Construction Cost": "float64",
+    "Maintenance Cost (NPV)": "float64",
+    "Opportunity Cost": "float64",
+    "Environmental Cost": "float64",
+    "Inflation Rate": "float64",
+    "Discount Rate": "float64",
+    "Occupancy Rate": "float64",
+    "Timestamp": "object",
+}
+
+# Maximum number of saved scenarios rendered in the comparison table
+MAX_TABLE_ROWS = 200
+
+# Cost breakdowns with more categories than this are drawn as bars, not a pie
+MAX_PIE_SLICES = 50
+
+
+# Cached computations. Streamlit reruns the whole script on every widget
+# interaction, so the numeric work is memoized on its (hashable) inputs.
+@st.cache_data(max_entries=32)
+def compute_costs(land_cost, construction_cost, maintenance_cost, inflation_rate, discount_rate,
+                  environmental_cost, spaces, years, opportunity_multiplier):
+    total_land_cost = land_cost * spaces * 15  # Adjusted for 15 sqm per space
+    total_construction_cost = construction_cost * spaces
+
+    # Calculate NPV of maintenance costs as the closed-form sum of the geometric
+    # series sum_{y=1..n} r**y, where r is the inflation/discount growth ratio
+    n_years = int(years)  # Ensure years is converted to int if it's not already
+    r = (1 + inflation_rate/100) / (1 + discount_rate/100)
+    if r != 1:
+        npv_maintenance = maintenance_cost * spaces * r * (1 - r**n_years) / (1 - r)
+    else:
+        npv_maintenance = maintenance_cost * spaces * n_years
+
+    total_opportunity_cost = total_land_cost * opportunity_multiplier
+    total_environmental_cost = environmental_cost * spaces * years
+
+    # Complete the total cost calculation; the component vector (ordered as
+    # COST_LABELS) is shared by the breakdown chart and the saved scenario
+    components = np.array([total_land_cost, total_construction_cost, npv_maintenance,
+                           total_opportunity_cost, total_environmental_cost])
+    total_cost = components.sum()
+
+    return dict(
+        components=components,
+        total_cost=total_cost,
+        cost_per_space=total_cost / spaces,
+        cost_per_year=total_cost / years,
+    )
+
+
+@st.cache_data(max_entries=32)
+def run_sensitivity(parameter, land_cost, construction_cost, maintenance_cost, inflation_rate,
+                    discount_rate, occupancy_rate, spaces, years, opportunity_multiplier,
+                    total_environmental_cost):
+    params = dict(land_cost=land_cost, construction_cost=construction_cost,
+                  maintenance_cost=maintenance_cost, inflation_rate=inflation_rate,
+                  discount_rate=discount_rate, occupancy_rate=occupancy_rate)
+    key = parameter.lower().replace(" ", "_")
+
+    # Vary the selected parameter from +10% to +50% in 5% steps and evaluate
+    # every step at once by broadcasting the array through the cost formula
+    sensitivity_values = params[key] * (1 + np.arange(10, 51, 5) / 100)
+    params[key] = sensitivity_values
+
+    # Hoist the growth/discount factors and fold land + opportunity cost into
+    # one multiplier
+    land_factor = spaces * 15 * (1 + opportunity_multiplier)
+    inflation_factor = 1 + params['inflation_rate']/100
+    discount_factor = params['discount_rate']/100
+    sensitivity_results = (
+        params['land_cost'] * land_factor +
+        params['construction_cost'] * spaces +
+        params['maintenance_cost'] * (spaces * years) * inflation_factor / discount_factor +
+        total_environmental_cost  # Add all expected costs here, replace this with actual variables
+    )
+    # Parameters outside the formula (e.g. occupancy) give a flat line
+    sensitivity_results = np.broadcast_to(sensitivity_results, sensitivity_values.shape)
+
+    return sensitivity_values, sensitivity_results
+
+
+@st.cache_data(max_entries=32)
+def run_monte_carlo(seed, n_simulations, land_cost_mean, land_cost_std, construction_cost_mean,
+                    construction_cost_std, maintenance_cost_mean, maintenance_cost_std, spaces, years,
+                    inflation_rate, discount_rate, opportunity_multiplier, total_environmental_cost):
+    # A fresh seeded PCG64 generator per call keeps the draws deterministic for a
+    # given set of inputs, which is what makes the result safe to memoize
+    rng = np.random.default_rng(seed)
+    n = int(n_simulations)
+    # One (3, n) standard-normal draw, scaled per parameter row
+    z = rng.standard_normal((3, n))
+    sim_land_cost = land_cost_mean + land_cost_std * z[0]
+    sim_construction_cost = construction_cost_mean + construction_cost_std * z[1]
+    sim_maintenance_cost = maintenance_cost_mean + maintenance_cost_std * z[2]
+
+    # The multipliers are the same for every draw, so compute them once
+    land_factor = spaces * 15 * (1 + opportunity_multiplier)
+    maintenance_factor = spaces * years * (1 + inflation_rate/100) / (discount_rate/100)
+
+    np.clip(sim_land_cost, 0, None, out=sim_land_cost)
+    np.clip(sim_construction_cost, 0, None, out=sim_construction_cost)
+    np.clip(sim_maintenance_cost, 0, None, out=sim_maintenance_cost)
+
+    return (
+        sim_land_cost * land_factor +
+        sim_construction_cost * spaces +
+        sim_maintenance_cost * maintenance_factor +
+        total_environmental_cost  # Replace or add other costs here
+    )
+
+
+@st.cache_data(max_entries=32)
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
+
+# Cached figure builders. Figures are rebuilt (and re-serialized) only when the
+# data they plot changes; arguments are tuples, arrays or frames so they hash.
+@st.cache_resource(max_entries=32)
+def build_cost_breakdown(labels, sizes):
+    # Pie label layout degrades quickly with many slices; fall back to a bar chart
+    if len(labels) > MAX_PIE_SLICES:
+        return px.bar(x=list(sizes), y=list(labels), orientation='h', title='Cost Breakdown')
+    return px.pie(names=list(labels), values=list(sizes), title='Cost Breakdown')
+
+
+@st.cache_resource(max_entries=32)
+def build_scenario_bar(scenario_df):
+    return px.bar(scenario_df, x='Scenario', y=COST_LABELS)
+
+
+@st.cache_resource(max_entries=32)
+def build_radar(scenario_df):
+    radar_cols = ['Total Cost (NPV)', 'Cost per Space', 'Inflation Rate', 'Discount Rate', 'Occupancy Rate']
+    radar_theta = ['Total Cost', 'Cost per Space', 'Inflation Rate', 'Discount Rate', 'Occupancy Rate']
+    fig = go.Figure()
+    for name, row in scenario_df.set_index('Scenario')[radar_cols].iterrows():
+        fig.add_trace(go.Scatterpolar(
+            r=row.values,
+            theta=radar_theta,
+            fill='toself',
+            name=name
+        ))
+    fig.update_layout(title="Multi-dimensional Scenario Comparison")
+    return fig
+
+
+@st.cache_resource(max_entries=32)
+def build_sensitivity_line(sensitivity_parameter, sensitivity_values, sensitivity_results):
+    return px.line(x=sensitivity_values, y=sensitivity_results, labels={'x': sensitivity_parameter, 'y': 'Total Cost'}, render_mode='webgl')
+
+
+@st.cache_resource(max_entries=32)
+def build_mc_histogram(simulation_results):
+    # Binned server-side so only the 50 bin counts are sent to the browser
+    # rather than every sample
+    counts, bin_edges = np.histogram(simulation_results, bins=50)
+    fig = go.Figure(go.Bar(x=(bin_edges[:-1] + bin_edges[1:]) / 2, y=counts, width=np.diff(bin_edges)))
+    fig.update_layout(xaxis_title='Total Cost', yaxis_title='Frequency', bargap=0)
+    return fig
+
 
 # Set up the page
 st.set_page_config(page_title="Advanced Shoup Parking Cost Calculator", layout="wide")
@@ -20,155 +192,154 @@ st.sidebar.markdown("""
 University of Auckland
 """)
 
-# Tabs for different sections
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Calculator", "Scenario Comparison", "Advanced Analytics", "Urban Planning", "Workplace Parking", "Methodology", "User Guide"])
+# Tabs for different sections. Tracking the active tab (on_change="rerun",
+# Streamlit 1.55+) exposes `.open`, which the tabs use to skip building
+# results and charts while hidden. Widgets are still rendered in every tab so
+# their values survive switching tabs.
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Calculator", "Scenario Comparison", "Advanced Analytics", "Urban Planning", "Workplace Parking", "Methodology", "User Guide"], key="active_tab", on_change="rerun")
+
+# Sidebar inputs for different scenarios. These live outside the tab bodies:
+# the tabs are fragments, which cannot write to the sidebar.
+st.sidebar.header("Input Parameters")
+scenario_name = st.sidebar.text_input("Scenario Name", "Base Scenario")
+parking_type = st.sidebar.selectbox("Parking Type", ["Surface", "Structured", "Underground"])
+
+# Advanced inputs with explanations
+with st.sidebar.expander("Advanced Inputs"):
+    st.write("Adjust these parameters for more precise calculations.")
+    spaces = st.number_input("Number of Parking Spaces", min_value=1.0, value=1.0, step=0.1, help="Total number of parking spaces in the project.")
+    years = st.number_input("Years of Use", min_value=1.0, value=1.0, step=0.1, help="Expected lifespan of the parking facility.")
+    opportunity_multiplier = st.slider("Opportunity Cost Multiplier", 0.0, 100.0, 50.0, step=0.1, help="Multiplier for the potential alternative use value of the land.")
+
+# Sidebar inputs for costs and rates
+with st.sidebar.expander("Cost Inputs"):
+    land_cost = st.number_input("Land Cost per sqm ($)", min_value=0.0, value=1000.0, step=0.1)
+    construction_cost = st.number_input("Construction Cost per space ($)", min_value=0.0, value=5000.0, step=0.1)
+    maintenance_cost = st.number_input("Maintenance Cost per space per year ($)", min_value=0.0, value=500.0, step=0.1)
+    inflation_rate = st.number_input("Inflation Rate (%)", min_value=0.0, value=2.0, step=0.1)
+    discount_rate = st.number_input("Discount Rate (%)", min_value=0.0, value=5.0, step=0.1)
+    occupancy_rate = st.number_input("Occupancy Rate (%)", min_value=0.0, value=80.0, step=0.1)
+
+with st.sidebar.expander("Environmental and Other Costs"):
+    environmental_cost = st.number_input("Environmental Cost per space per year ($)", min_value=0.0, value=100.0, step=0.1)
+    parking_fee = st.number_input("Parking Fee per hour ($)", min_value=0.0, value=2.0, step=0.1)
+    car_ownership_rate = st.number_input("Car Ownership Rate (%)", min_value=0.0, value=50.0, step=0.1)
+    parking_demand_factor = st.number_input("Parking Demand Factor", min_value=0.0, value=1.0, step=0.1)
+
+# Perform calculations shared by the calculator and analytics tabs
+costs = compute_costs(land_cost, construction_cost, maintenance_cost, inflation_rate, discount_rate,
+                      environmental_cost, spaces, years, opportunity_multiplier)
+cost_components = costs['components']
+total_land_cost, total_construction_cost, npv_maintenance, total_opportunity_cost, total_environmental_cost = cost_components
+total_cost = costs['total_cost']
+cost_per_space = costs['cost_per_space']
+cost_per_year = costs['cost_per_year']
 
 with tab1:
-    # Sidebar inputs for different scenarios
-    st.sidebar.header("Input Parameters")
-    scenario_name = st.sidebar.text_input("Scenario Name", "Base Scenario")
-    parking_type = st.sidebar.selectbox("Parking Type", ["Surface", "Structured", "Underground"])
-
-    # Advanced inputs with explanations
-    with st.sidebar.expander("Advanced Inputs"):
-        st.write("Adjust these parameters for more precise calculations.")
-        spaces = st.number_input("Number of Parking Spaces", min_value=1.0, value=1.0, step=0.1, help="Total number of parking spaces in the project.")
-        years = st.number_input("Years of Use", min_value=1.0, value=1.0, step=0.1, help="Expected lifespan of the parking facility.")
-        opportunity_multiplier = st.slider("Opportunity Cost Multiplier", 0.0, 100.0, 50.0, step=0.1, help="Multiplier for the potential alternative use value of the land.")
-        
-    # Sidebar inputs for costs and rates
-    with st.sidebar.expander("Cost Inputs"):
-        land_cost = st.number_input("Land Cost per sqm ($)", min_value=0.0, value=1000.0, step=0.1)
-        construction_cost = st.number_input("Construction Cost per space ($)", min_value=0.0, value=5000.0, step=0.1)
-        maintenance_cost = st.number_input("Maintenance Cost per space per year ($)", min_value=0.0, value=500.0, step=0.1)
-        inflation_rate = st.number_input("Inflation Rate (%)", min_value=0.0, value=2.0, step=0.1)
-        discount_rate = st.number_input("Discount Rate (%)", min_value=0.0, value=5.0, step=0.1)
-        occupancy_rate = st.number_input("Occupancy Rate (%)", min_value=0.0, value=80.0, step=0.1)
-
-    with st.sidebar.expander("Environmental and Other Costs"):
-        environmental_cost = st.number_input("Environmental Cost per space per year ($)", min_value=0.0, value=100.0, step=0.1)
-        parking_fee = st.number_input("Parking Fee per hour ($)", min_value=0.0, value=2.0, step=0.1)
-        car_ownership_rate = st.number_input("Car Ownership Rate (%)", min_value=0.0, value=50.0, step=0.1)
-        parking_demand_factor = st.number_input("Parking Demand Factor", min_value=0.0, value=1.0, step=0.1)
-
-    # Perform calculations
-    total_land_cost = land_cost * spaces * 15  # Adjusted for 15 sqm per space
-    total_construction_cost = construction_cost * spaces
-
-    # Calculate NPV of maintenance costs
-    npv_maintenance = 0
-    for year in range(1, int(years) + 1):  # Ensure years is converted to int if it's not already
-        nominal_maintenance = maintenance_cost * spaces * (1 + inflation_rate/100)**year
-        npv_maintenance += nominal_maintenance / (1 + discount_rate/100)**year
-    
-    total_opportunity_cost = total_land_cost * opportunity_multiplier
-    total_environmental_cost = environmental_cost * spaces * years
-    
-    # Complete the total cost calculation
-    total_cost = (total_land_cost + total_construction_cost + 
-                  npv_maintenance + total_opportunity_cost + 
-                  total_environmental_cost)
-    
-    cost_per_space = total_cost / spaces
-    cost_per_year = total_cost / years
-
-    # Display results with expanded breakdown
-    st.header("Results")
-    st.subheader(f"Scenario: {scenario_name}")
-
-    # Use columns for a more compact layout
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write(f"**Total Land Cost:** ${total_land_cost:,.2f}")
-        st.write(f"**Total Construction Cost:** ${total_construction_cost:,.2f}")
-        st.write(f"**NPV of Maintenance Costs:** ${npv_maintenance:,.2f}")
-    with col2:
-        st.write(f"**Total Opportunity Cost:** ${total_opportunity_cost:,.2f}")
-        st.write(f"**Total Environmental Cost:** ${total_environmental_cost:,.2f}")
-        st.write(f"**Total Cost (NPV):** ${total_cost:,.2f}")
-
-    st.write(f"**Cost per Parking Space:** ${cost_per_space:,.2f}")
-    st.write(f"**Cost per Year:** ${cost_per_year:,.2f}")
-
-    # Interactive chart for cost breakdown using Plotly
-    labels = ['Land Cost', 'Construction Cost', 'Maintenance Cost (NPV)', 'Opportunity Cost', 'Environmental Cost']
-    sizes = [total_land_cost, total_construction_cost, npv_maintenance, total_opportunity_cost, total_environmental_cost]
-    fig = px.pie(names=labels, values=sizes, title='Cost Breakdown')
-    st.plotly_chart(fig)
-
-    # Scenario saving
-    if st.button("Save Scenario"):
-        if 'scenario_data' not in st.session_state:
-            st.session_state['scenario_data'] = []
-        
-        scenario_data = {
-            "Scenario": scenario_name,
-            "Type": parking_type,
-            "Total Cost (NPV)": total_cost,
-            "Cost per Space": cost_per_space,
-            "Cost per Year": cost_per_year,
-            "Land Cost": total_land_cost,
-            "Construction Cost": total_construction_cost,
-            "Maintenance Cost (NPV)": npv_maintenance,
-            "Opportunity Cost": total_opportunity_cost,
-            "Environmental Cost": total_environmental_cost,
-            "Inflation Rate": inflation_rate,
-            "Discount Rate": discount_rate,
-            "Occupancy Rate": occupancy_rate,
-            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        st.session_state['scenario_data'].append(scenario_data)
-        st.success(f"Scenario '{scenario_name}' saved successfully!")
-
-with tab2:
+    if tab1.open:
+        # Display results with expanded breakdown
+        st.header("Results")
+        st.subheader(f"Scenario: {scenario_name}")
+
+        # Use columns for a more compact layout
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write(f"**Total Land Cost:** ${total_land_cost:,.2f}")
+            st.write(f"**Total Construction Cost:** ${total_construction_cost:,.2f}")
+            st.write(f"**NPV of Maintenance Costs:** ${npv_maintenance:,.2f}")
+        with col2:
+            st.write(f"**Total Opportunity Cost:** ${total_opportunity_cost:,.2f}")
+            st.write(f"**Total Environmental Cost:** ${total_environmental_cost:,.2f}")
+            st.write(f"**Total Cost (NPV):** ${total_cost:,.2f}")
+
+        st.write(f"**Cost per Parking Space:** ${cost_per_space:,.2f}")
+        st.write(f"**Cost per Year:** ${cost_per_year:,.2f}")
+
+        # Interactive chart for cost breakdown using Plotly
+        fig = build_cost_breakdown(tuple(COST_LABELS), cost_components)
+        st.plotly_chart(fig)
+
+        # Scenario saving. The calculator tab is deliberately not a fragment, so
+        # saving reruns the whole app and the comparison tab shows the new scenario.
+        if st.button("Save Scenario"):
+            if 'scenario_df' not in st.session_state:
+                st.session_state['scenario_df'] = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SCENARIO_DTYPES.items()})
+            
+            scenario_data = {
+                "Scenario": scenario_name,
+                "Type": parking_type,
+                "Total Cost (NPV)": total_cost,
+                "Cost per Space": cost_per_space,
+                "Cost per Year": cost_per_year,
+                "Land Cost": total_land_cost,
+                "Construction Cost": total_construction_cost,
+                "Maintenance Cost (NPV)": npv_maintenance,
+                "Opportunity Cost": total_opportunity_cost,
+                "Environmental Cost": total_environmental_cost,
+                "Inflation Rate": inflation_rate,
+                "Discount Rate": discount_rate,
+                "Occupancy Rate": occupancy_rate,
+                "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            scenario_df = st.session_state['scenario_df']
+            scenario_df.loc[len(scenario_df)] = scenario_data
+            st.success(f"Scenario '{scenario_name}' saved successfully!")
+
+
+@st.fragment
+def render_scenario_comparison(show_results):
     # Display saved scenarios with option to remove
-    if 'scenario_data' in st.session_state and st.session_state['scenario_data']:
+    if 'scenario_df' in st.session_state and not st.session_state['scenario_df'].empty:
         st.subheader("Scenario Comparison")
-        scenario_df = pd.DataFrame(st.session_state['scenario_data'])
+        scenario_df = st.session_state['scenario_df']
         
         # Option to remove scenarios
         scenarios_to_remove = st.multiselect("Select scenarios to remove:", scenario_df['Scenario'].unique())
-        if st.button("Remove Selected Scenarios"):
-            st.session_state['scenario_data'] = [scenario for scenario in st.session_state['scenario_data'] if scenario['Scenario'] not in scenarios_to_remove]
-            scenario_df = pd.DataFrame(st.session_state['scenario_data'])
+        if st.button("Remove Selected Scenarios") and scenarios_to_remove:
+            # Filter with a mask and renumber so appends at len(df) stay collision-free
+            keep = ~scenario_df['Scenario'].isin(scenarios_to_remove)
+            scenario_df = st.session_state['scenario_df'] = scenario_df.loc[keep].reset_index(drop=True)
             st.success("Selected scenarios removed.")
         
-        st.dataframe(scenario_df)
+        if show_results:
+            # Only the most recent scenarios are sent to the browser as a table
+            if len(scenario_df) > MAX_TABLE_ROWS:
+                st.caption(f"Showing the {MAX_TABLE_ROWS} most recent of {len(scenario_df)} scenarios.")
+            st.dataframe(scenario_df.tail(MAX_TABLE_ROWS), hide_index=True)
         
-        # Visualization of multiple scenarios using Plotly
-        fig = px.bar(scenario_df, x='Scenario', y=['Land Cost', 'Construction Cost', 'Maintenance Cost (NPV)', 'Opportunity Cost', 'Environmental Cost'])
-        st.plotly_chart(fig)  # Ensure this line is complete
+            # Visualization of multiple scenarios using Plotly
+            fig = build_scenario_bar(scenario_df)
+            st.plotly_chart(fig)  # Ensure this line is complete
 
 
-        fig = go.Figure()
-        for scenario in scenario_df['Scenario']:
-            fig.add_trace(go.Scatterpolar(
-                r=[scenario_df[scenario_df['Scenario'] == scenario]['Total Cost (NPV)'].values[0],
-                   scenario_df[scenario_df['Scenario'] == scenario]['Cost per Space'].values[0],
-                   scenario_df[scenario_df['Scenario'] == scenario]['Inflation Rate'].values[0],
-                   scenario_df[scenario_df['Scenario'] == scenario]['Discount Rate'].values[0],
-                   scenario_df[scenario_df['Scenario'] == scenario]['Occupancy Rate'].values[0]],
-                theta=['Total Cost', 'Cost per Space', 'Inflation Rate', 'Discount Rate', 'Occupancy Rate'],
-                fill='toself',
-                name=scenario
-            ))
-        fig.update_layout(title="Multi-dimensional Scenario Comparison")
-        st.plotly_chart(fig)  # Ensure this line is complete
-
-        # Export data option
-        if st.button("Export Data to CSV"):
-            csv = scenario_df.to_csv(index=False)
+            fig = build_radar(scenario_df)
+            st.plotly_chart(fig)  # Ensure this line is complete
+
+            # Export data option
             st.download_button(
                 label="Download CSV",
-                data=csv,
+                data=to_csv_bytes(scenario_df),
                 file_name="parking_cost_scenarios.csv",
                 mime="text/csv"
-            )  # Closing parenthesis here is important
+            )
 
-                
-with tab3:
+
+with tab2:
+    render_scenario_comparison(show_results=tab2.open)
+
+
+@st.fragment
+def render_advanced_analytics(land_cost, construction_cost, maintenance_cost, inflation_rate, discount_rate,
+                              occupancy_rate, spaces, years, opportunity_multiplier, total_environmental_cost,
+                              show_results):
     st.subheader("Advanced Analytics")
 
+    # Both analyses divide the maintenance term by the discount rate, so they
+    # are undefined at 0%; keep the controls but skip the computations
+    discount_defined = discount_rate > 0
+    if show_results and not discount_defined:
+        st.warning("Sensitivity analysis and Monte Carlo simulation require a Discount Rate above 0%.")
+
     # Sensitivity analysis
     st.write("### Sensitivity Analysis")
     sensitivity_parameter = st.selectbox(
@@ -176,73 +347,68 @@ with tab3:
         ["Land Cost", "Construction Cost", "Maintenance Cost", "Inflation Rate", "Discount Rate", "Occupancy Rate"]
     )
 
-    # Perform sensitivity analysis
-    base_value = locals()[sensitivity_parameter.lower().replace(" ", "_")]
-    sensitivity_range = [10, 50]  # Example range, replace with your actual range variables
-    sensitivity_values = [base_value * (1 + i/100) for i in range(sensitivity_range[0], sensitivity_range[1]+1, 5)]
-    sensitivity_results = []
-
-    for value in sensitivity_values:
-        locals()[sensitivity_parameter.lower().replace(" ", "_")] = value
-        total_cost = (
-            land_cost * spaces * 15 +
-            construction_cost * spaces +
-            maintenance_cost * spaces * years * (1 + inflation_rate/100) / (discount_rate/100) +
-            land_cost * spaces * 15 * opportunity_multiplier +
-            total_environmental_cost  # Add all expected costs here, replace this with actual variables
+    if show_results and discount_defined:
+        # Perform sensitivity analysis
+        sensitivity_values, sensitivity_results = run_sensitivity(
+            sensitivity_parameter, land_cost, construction_cost, maintenance_cost, inflation_rate,
+            discount_rate, occupancy_rate, spaces, years, opportunity_multiplier, total_environmental_cost
         )
 
-        sensitivity_results.append(total_cost)
-
-    fig = px.line(x=sensitivity_values, y=sensitivity_results, labels={'x': sensitivity_parameter, 'y': 'Total Cost'})
-    st.plotly_chart(fig)
-
-    # Reset the modified variable
-    locals()[sensitivity_parameter.lower().replace(" ", "_")] = base_value
+        fig = build_sensitivity_line(sensitivity_parameter, sensitivity_values, sensitivity_results)
+        st.plotly_chart(fig)
 
     # Monte Carlo simulation
     st.write("### Monte Carlo Simulation")
     n_simulations = st.slider("Number of Simulations", 0, 100, 50, step=1)  # Ensure integer values
-
-    # Define probability distributions for key parameters
-    land_cost_mean, land_cost_std = land_cost, land_cost * 0.1
-    construction_cost_mean, construction_cost_std = construction_cost, construction_cost * 0.15
-    maintenance_cost_mean, maintenance_cost_std = maintenance_cost, maintenance_cost * 0.2
-
-    # Run Monte Carlo simulation
-    simulation_results = []
-    for _ in range(int(n_simulations)):
-        sim_land_cost = max(0, np.random.normal(land_cost_mean, land_cost_std))
-        sim_construction_cost = max(0, np.random.normal(construction_cost_mean, construction_cost_std))
-        sim_maintenance_cost = max(0, np.random.normal(maintenance_cost_mean, maintenance_cost_std))
-
-        sim_total_cost = (
-            sim_land_cost * spaces * 15 +
-            sim_construction_cost * spaces +
-            sim_maintenance_cost * spaces * years * (1 + inflation_rate/100) / (discount_rate/100) +
-            sim_land_cost * spaces * 15 * opportunity_multiplier +
-            total_environmental_cost  # Replace or add other costs here
+    mc_seed = st.number_input("Random Seed", min_value=0, value=0, step=1, help="Fixed seed so repeated runs with the same inputs give the same results.")
+
+    if show_results and discount_defined:
+        # Define probability distributions for key parameters
+        land_cost_mean, land_cost_std = land_cost, land_cost * 0.1
+        construction_cost_mean, construction_cost_std = construction_cost, construction_cost * 0.15
+        maintenance_cost_mean, maintenance_cost_std = maintenance_cost, maintenance_cost * 0.2
+
+        # Run Monte Carlo simulation
+        simulation_results = run_monte_carlo(
+            mc_seed, n_simulations, land_cost_mean, land_cost_std, construction_cost_mean,
+            construction_cost_std, maintenance_cost_mean, maintenance_cost_std, spaces, years,
+            inflation_rate, discount_rate, opportunity_multiplier, total_environmental_cost
         )
 
-        simulation_results.append(sim_total_cost)
+        # Plot Monte Carlo simulation results
+        fig = build_mc_histogram(simulation_results)
+        st.plotly_chart(fig)
 
-    # Plot Monte Carlo simulation results
-    fig = px.histogram(simulation_results, nbins=50, labels={'value': 'Total Cost', 'count': 'Frequency'})
-    st.plotly_chart(fig)
+        # Calculate and display statistics; scipy is only needed here, so it is
+        # imported lazily rather than on every cold start
+        from scipy import stats
 
-    # Calculate and display statistics
-    mean_cost = np.mean(simulation_results)
-    median_cost = np.median(simulation_results)
-    std_dev = np.std(simulation_results)
-    ci_lower, ci_upper = stats.t.interval(0.95, len(simulation_results)-1, loc=mean_cost, scale=stats.sem(simulation_results))
+        mean_cost = np.mean(simulation_results)
+        median_cost = np.median(simulation_results)
+        std_dev = np.std(simulation_results)
+        # Standard error from the population std already computed above:
+        # std(ddof=1) / sqrt(n) == std(ddof=0) / sqrt(n - 1), so no second pass is needed
+        n_results = len(simulation_results)
+        if n_results > 1:
+            sem = std_dev / np.sqrt(n_results - 1)
+            ci_lower, ci_upper = stats.t.interval(0.95, n_results - 1, loc=mean_cost, scale=sem)
+        else:
+            ci_lower = ci_upper = np.nan
 
-    st.write(f"Mean Total Cost: ${mean_cost:,.2f}")
-    st.write(f"Median Total Cost: ${median_cost:,.2f}")
-    st.write(f"Standard Deviation: ${std_dev:,.2f}")
-    st.write(f"95% Confidence Interval: (${ci_lower:,.2f}, ${ci_upper:,.2f})")
+        st.write(f"Mean Total Cost: ${mean_cost:,.2f}")
+        st.write(f"Median Total Cost: ${median_cost:,.2f}")
+        st.write(f"Standard Deviation: ${std_dev:,.2f}")
+        st.write(f"95% Confidence Interval: (${ci_lower:,.2f}, ${ci_upper:,.2f})")
 
 
-with tab4:
+with tab3:
+    render_advanced_analytics(land_cost, construction_cost, maintenance_cost, inflation_rate, discount_rate,
+                              occupancy_rate, spaces, years, opportunity_multiplier, total_environmental_cost,
+                              show_results=tab3.open)
+
+
+@st.fragment
+def render_urban_planning(car_ownership_rate, parking_demand_factor, parking_fee, show_results):
     st.subheader("Urban Planning and Policy Analysis")
 
     # Street parking analysis
@@ -296,12 +462,19 @@ with tab4:
     st.write(f"New estimated parking demand: {new_demand} spaces")
 
     # Visualization of policy impact
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=['Current Demand', 'New Demand'], y=[estimated_parking_demand, new_demand]))
-    fig.update_layout(title="Impact of Parking Fee on Demand")
-    st.plotly_chart(fig)
+    if show_results:
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=['Current Demand', 'New Demand'], y=[estimated_parking_demand, new_demand]))
+        fig.update_layout(title="Impact of Parking Fee on Demand")
+        st.plotly_chart(fig)
 
-with tab5:
+
+with tab4:
+    render_urban_planning(car_ownership_rate, parking_demand_factor, parking_fee, show_results=tab4.open)
+
+
+@st.fragment
+def render_workplace_parking(show_results):
     st.subheader("Workplace Parking Cost Analysis")
     
     st.write("""
@@ -346,14 +519,15 @@ with tab5:
     st.write(f"Cost per Space per Year: ${total_annual_cost/num_spaces:,.2f}")
     st.write(f"Cost per Space per Month: ${total_annual_cost/num_spaces/12:,.2f}")
     
-    fig = go.Figure(data=[
-        go.Bar(name='Construction', y=['Cost'], x=[construction_cost], orientation='h'),
-        go.Bar(name='Land', y=['Cost'], x=[land_cost], orientation='h'),
-        go.Bar(name='Annual Maintenance', y=['Cost'], x=[annual_maintenance], orientation='h'),
-        go.Bar(name='Annual Opportunity Cost', y=['Cost'], x=[annual_opportunity_cost], orientation='h')
-    ])
-    fig.update_layout(barmode='stack', title='Breakdown of Parking Costs')
-    st.plotly_chart(fig)
+    if show_results:
+        fig = go.Figure(data=[
+            go.Bar(name='Construction', y=['Cost'], x=[construction_cost], orientation='h'),
+            go.Bar(name='Land', y=['Cost'], x=[land_cost], orientation='h'),
+            go.Bar(name='Annual Maintenance', y=['Cost'], x=[annual_maintenance], orientation='h'),
+            go.Bar(name='Annual Opportunity Cost', y=['Cost'], x=[annual_opportunity_cost], orientation='h')
+        ])
+        fig.update_layout(barmode='stack', title='Breakdown of Parking Costs')
+        st.plotly_chart(fig)
 
     # Alternative analysis
     st.subheader("Alternative Analysis")
@@ -382,99 +556,107 @@ with tab5:
     st.write(f"Potential annual savings: ${carpool_annual_savings:,.2f}")
 
     # Comparison chart
-    fig = go.Figure(data=[
-        go.Bar(name='Current Parking Cost', x=['Cost'], y=[total_annual_cost]),
-        go.Bar(name='Public Transit Subsidy', x=['Cost'], y=[annual_transit_subsidy]),
-        go.Bar(name='Remote Work (Reduced Parking)', x=['Cost'], y=[reduced_annual_cost]),
-        go.Bar(name='Carpooling Incentive', x=['Cost'], y=[total_annual_cost - carpool_annual_savings])
-    ])
-    fig.update_layout(title='Comparison of Parking Alternatives')
-    st.plotly_chart(fig)
+    if show_results:
+        fig = go.Figure(data=[
+            go.Bar(name='Current Parking Cost', x=['Cost'], y=[total_annual_cost]),
+            go.Bar(name='Public Transit Subsidy', x=['Cost'], y=[annual_transit_subsidy]),
+            go.Bar(name='Remote Work (Reduced Parking)', x=['Cost'], y=[reduced_annual_cost]),
+            go.Bar(name='Carpooling Incentive', x=['Cost'], y=[total_annual_cost - carpool_annual_savings])
+        ])
+        fig.update_layout(title='Comparison of Parking Alternatives')
+        st.plotly_chart(fig)
+
+
+with tab5:
+    render_workplace_parking(show_results=tab5.open)
+
 
 with tab6:
-    st.subheader("Methodology & Assumptions")
-    st.write("""
-    This calculator uses an advanced version of the Shoup model for estimating parking costs. Key features and assumptions include:
+    if tab6.open:
+        st.subheader("Methodology & Assumptions")
+        st.write("""
+        This calculator uses an advanced version of the Shoup model for estimating parking costs. Key features and assumptions include:
 
-    1. **Land Use**: We assume 15 square meters per parking space, which includes the space itself and necessary access lanes.
-    
-    2. **Net Present Value (NPV)**: All future costs are discounted to present value using the specified discount rate, allowing for more accurate long-term cost estimates.
-    
-    3. **Inflation**: The model accounts for inflation in maintenance costs over time.
-    
-    4. **Opportunity Cost**: This represents the potential value of the land if used for purposes other than parking.
-    
-    5. **Environmental Cost**: An estimate of the environmental impact of creating and maintaining parking spaces.
-    
-    6. **Sensitivity Analysis**: This feature allows users to understand how changes in key parameters affect the total cost.
-    
-    7. **Monte Carlo Simulation**: This advanced feature accounts for uncertainty in cost estimates by running multiple simulations with randomly varied inputs.
+        1. **Land Use**: We assume 15 square meters per parking space, which includes the space itself and necessary access lanes.
+        
+        2. **Net Present Value (NPV)**: All future costs are discounted to present value using the specified discount rate, allowing for more accurate long-term cost estimates.
+        
+        3. **Inflation**: The model accounts for inflation in maintenance costs over time.
+        
+        4. **Opportunity Cost**: This represents the potential value of the land if used for purposes other than parking.
+        
+        5. **Environmental Cost**: An estimate of the environmental impact of creating and maintaining parking spaces.
+        
+        6. **Sensitivity Analysis**: This feature allows users to understand how changes in key parameters affect the total cost.
+        
+        7. **Monte Carlo Simulation**: This advanced feature accounts for uncertainty in cost estimates by running multiple simulations with randomly varied inputs.
 
-    The model aims to provide a comprehensive view of parking costs, including often-overlooked factors like opportunity costs and environmental impacts. However, users should note that local conditions and specific project details may necessitate adjustments to these calculations.
+        The model aims to provide a comprehensive view of parking costs, including often-overlooked factors like opportunity costs and environmental impacts. However, users should note that local conditions and specific project details may necessitate adjustments to these calculations.
 
-    **Additional Methodologies for Urban Planning:**
+        **Additional Methodologies for Urban Planning:**
 
-    1. **Street Parking Analysis**: Estimates the number of potential parking spaces and area used based on street dimensions.
-    
-    2. **Alternative Use Analysis**: Provides insights into potential alternative uses for street parking spaces.
-    
-    3. **Parking Demand Estimation**: Uses population, car ownership rates, and local factors to estimate parking demand.
-    
-    4. **Parking Policy Impact**: Utilizes price elasticity of demand to estimate the impact of parking fees on demand.
+        1. **Street Parking Analysis**: Estimates the number of potential parking spaces and area used based on street dimensions.
+        
+        2. **Alternative Use Analysis**: Provides insights into potential alternative uses for street parking spaces.
+        
+        3. **Parking Demand Estimation**: Uses population, car ownership rates, and local factors to estimate parking demand.
+        
+        4. **Parking Policy Impact**: Utilizes price elasticity of demand to estimate the impact of parking fees on demand.
 
-    These additional features aim to provide urban planners and policymakers with tools to assess the broader impacts of parking policies and alternative land uses. The calculations are simplified models and should be adjusted based on specific local conditions and more detailed data when available.
+        These additional features aim to provide urban planners and policymakers with tools to assess the broader impacts of parking policies and alternative land uses. The calculations are simplified models and should be adjusted based on specific local conditions and more detailed data when available.
 
-    For more detailed information on parking economics, refer to:
-    - "The High Cost of Free Parking" by Donald Shoup
-    - "Parking and the City" edited by Donald Shoup
-    - Victoria Transport Policy Institute's "Transportation Cost and Benefit Analysis II – Parking Costs"
-    """)
+        For more detailed information on parking economics, refer to:
+        - "The High Cost of Free Parking" by Donald Shoup
+        - "Parking and the City" edited by Donald Shoup
+        - Victoria Transport Policy Institute's "Transportation Cost and Benefit Analysis II – Parking Costs"
+        """)
 
 with tab7:
-    st.subheader("User Guide")
-    st.write("""
-    Welcome to the Advanced Shoup Parking Cost Calculator! This guide will help you navigate the various features of this tool.
-
-    ### 1. Calculator Tab
-    - Input your scenario parameters in the sidebar.
-    - View the cost breakdown and results.
-    - Save scenarios for later comparison.
-
-    ### 2. Scenario Comparison Tab
-    - Compare multiple saved scenarios.
-    - Visualize differences using bar charts and radar plots.
-    - Export scenario data to CSV for further analysis.
-
-    ### 3. Advanced Analytics Tab
-    - Perform sensitivity analysis on key parameters.
-    - Run Monte Carlo simulations to account for uncertainty.
-    - View statistical summaries of simulation results.
-
-    ### 4. Urban Planning Tab
-    - Analyze street parking potential and alternative uses.
-    - Estimate parking demand based on population and local factors.
-    - Assess the impact of parking policies on demand.
-
-    ### 5. Workplace Parking Tab
-    - Calculate the true cost of providing employee parking.
-    - Consider construction, land, maintenance, and opportunity costs.
-    - Explore alternatives like public transit subsidies, remote work, and carpooling incentives.
-    - Compare costs of different parking strategies for your organization.
-
-    ### 6. Methodology Tab
-    - Understand the underlying assumptions and calculations.
-    - Learn about the Shoup model and its extensions.
-
-    ### Tips for Use:
-    - Start with the Calculator tab to input your base scenario.
-    - Use the Scenario Comparison to evaluate different options.
-    - Leverage Advanced Analytics for more in-depth understanding.
-    - Utilize the Urban Planning features for broader policy considerations.
-    - Use the Workplace Parking tab for business-specific parking cost analysis.
-    - Refer to the Methodology tab to understand the underlying principles.
-
-    Remember, while this tool provides valuable insights, it should be used in conjunction with local knowledge and additional data for making real-world decisions.
-    """)
+    if tab7.open:
+        st.subheader("User Guide")
+        st.write("""
+        Welcome to the Advanced Shoup Parking Cost Calculator! This guide will help you navigate the various features of this tool.
+
+        ### 1. Calculator Tab
+        - Input your scenario parameters in the sidebar.
+        - View the cost breakdown and results.
+        - Save scenarios for later comparison.
+
+        ### 2. Scenario Comparison Tab
+        - Compare multiple saved scenarios.
+        - Visualize differences using bar charts and radar plots.
+        - Download scenario data as CSV for further analysis.
+
+        ### 3. Advanced Analytics Tab
+        - Perform sensitivity analysis on key parameters.
+        - Run Monte Carlo simulations to account for uncertainty.
+        - View statistical summaries of simulation results.
+
+        ### 4. Urban Planning Tab
+        - Analyze street parking potential and alternative uses.
+        - Estimate parking demand based on population and local factors.
+        - Assess the impact of parking policies on demand.
+
+        ### 5. Workplace Parking Tab
+        - Calculate the true cost of providing employee parking.
+        - Consider construction, land, maintenance, and opportunity costs.
+        - Explore alternatives like public transit subsidies, remote work, and carpooling incentives.
+        - Compare costs of different parking strategies for your organization.
+
+        ### 6. Methodology Tab
+        - Understand the underlying assumptions and calculations.
+        - Learn about the Shoup model and its extensions.
+
+        ### Tips for Use:
+        - Start with the Calculator tab to input your base scenario.
+        - Use the Scenario Comparison to evaluate different options.
+        - Leverage Advanced Analytics for more in-depth understanding.
+        - Utilize the Urban Planning features for broader policy considerations.
+        - Use the Workplace Parking tab for business-specific parking cost analysis.
+        - Refer to the Methodology tab to understand the underlying principles.
+
+        Remember, while this tool provides valuable insights, it should be used in conjunction with local knowledge and additional data for making real-world decisions.
+        """)
 
 
 # Footer with additional resources